@@ -1,30 +1,35 @@
+import asyncio
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import os
 import json
-import selenium.common
 import xrate_currency_conversion as xcc
 from pathlib import Path
-from selenium import webdriver
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from selenium.webdriver.firefox.service import Service as FirefoxService
+from functools import lru_cache
 import warnings
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import StaleElementReferenceException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.firefox.options import Options
 from datetime import datetime
-from selenium.webdriver.support.ui import Select
-import time
 from datetime import date
+from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 import shutil
-import requests
+import httpx
 # import pandas as pd
-from bs4 import BeautifulSoup
-
-import collections
-
-collections.Callable = collections.abc.Callable
+import lxml.html as LH
+import openpyxl
+from openpyxl.utils.dataframe import dataframe_to_rows
+
+MAX_CONCURRENT_REQUESTS = 16
+MAX_WORKERS = 8
+XRATES_BASE_URL = "https://www.x-rates.com"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.93 Safari/537.36'}
+CURRENT_YEAR_CACHE_EXPIRY = timedelta(hours=6)
+INPUT_DTYPES = {"Initial Currency": "string", "Fetched Year": "Int16"}
+MONTH_MAP = {
+    month: number for number, month in enumerate(
+        ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"], 1)
+}
 
 def get_global_config():
     """
@@ -59,91 +64,45 @@ def get_data_path(global_config: dict):
     return Path(global_config['data_path'])
 
 
-def get_input_df(data_path, global_config):
-    """
-        this function creates a dataframe from a given Excel file
-
-        Args:
-            data_path (Path): path to the folder where file is stored
-            global_config (dict): configuration in dictionary format
-
-        Returns:
-            pandas.DataFrame: dataframe created from the given Excel file
-    """
-
-    input_wb_path = os.path.join(data_path, global_config["input_file_name"])
-    input_df = pd.read_excel(input_wb_path)
-    return input_df
-
-
-def init_driver(
-        headless: bool = False,
-        user_data_dir: str = None,
-        browser: str = "firefox",
-        log: bool = False
-) -> webdriver.Firefox:
+def normalize_mixed_columns(df: pd.DataFrame):
     """
-        this function automatically open the web-browser
+        this function casts the object columns that mix value types (e.g. numbers and text) to
+        strings, since Parquet can only store one type per column
 
         Args:
-            headless (bool): decides whether to show UI Window or not
-            user_data_dir (str):
-            browser (str): browser to be used
-            log (bool): decides whether to log or not
+            df (pandas.DataFrame): the data frame to be normalized
 
         Returns:
-            WebDriver: an API that automates web browsing
+            pandas.DataFrame: the data frame with its mixed columns stored as strings
     """
-
-    if browser == "firefox":
-        options = FirefoxOptions()
-    else:
-        raise ValueError("Invalid Browser: {}".format(browser))
-
-    if headless:
-        options.add_argument("--headless")
-
-    if not log:
-        options.add_argument("--disable-logging")
-
-    driver_path = os.path.join(os.getcwd(), "geckodriver.exe")
-    driver = webdriver.Firefox(service=FirefoxService(driver_path, log_output=os.devnull),
-                               options=options)
-    driver.maximize_window()
-
-    return driver
+    mixed_columns = [col for col in df.columns[df.dtypes == object]
+                     if df[col].dropna().map(type).nunique() > 1]
+    if not mixed_columns:
+        return df
+    return df.astype({col: "string" for col in mixed_columns})
 
 
-def make_df_copy(df: pd.DataFrame):
+def get_input_df(data_path, global_config):
     """
-        this function makes a copy of the data frame
+        this function creates a dataframe from the stored inputs. The Parquet copy is used unless
+        the given Excel file has been edited after it was written
 
         Args:
-            df (pandas.DataFrame): the data frame to be copied
+            data_path (Path): path to the folder where file is stored
+            global_config (dict): configuration in dictionary format
 
         Returns:
-            pandas.DataFrame: the copied data frame
-    """
-    assert isinstance(df, pd.DataFrame)
-    return df.copy()
-
-
-def create_mapped_column(col_name: str, dfs: [pd.DataFrame]):
+            pandas.DataFrame: dataframe created from the stored inputs
     """
-        this function creates a new mapped column in the data frame
 
-        Args:
-            col_name (str): the name of the column to be mapped
-            dfs (pandas.DataFrame): the given data frame
-    """
-    df = dfs["add column to this df"]
-    mapped_df = dfs["mapped_df"]
-    mapping_df = dfs["mapping_df"]
-
-    mapping_dict = mapping_df[col_name].to_dict()
+    input_wb_path = os.path.join(data_path, global_config["input_file_name"])
+    input_parquet_path = os.path.join(data_path, "inputs.parquet")
+    if os.path.exists(input_parquet_path) and \
+            os.path.getmtime(input_parquet_path) >= os.path.getmtime(input_wb_path):
+        return normalize_mixed_columns(pd.read_parquet(input_parquet_path).astype(INPUT_DTYPES))
 
-    modified_col_name = col_name.replace("Current", "Initial")
-    df[modified_col_name] = mapped_df.index.map(mapping_dict)
+    input_df = pd.read_excel(input_wb_path, dtype=INPUT_DTYPES, engine="openpyxl")
+    return normalize_mixed_columns(input_df)
 
 
 def add_informative_columns(df: pd.DataFrame, input_df: pd.DataFrame):
@@ -157,26 +116,45 @@ def add_informative_columns(df: pd.DataFrame, input_df: pd.DataFrame):
         Returns:
             pandas.DataFrame: the new data frame containing the new columns
     """
-    input_df_copy = make_df_copy(input_df)
-    df_copy = make_df_copy(df)
-
-    mapping_related_dfs = {
-        "add column to this df": df,
-        "mapped_df": df_copy,
-        "mapping_df": input_df_copy,
+    renamer = {
+        "Current Currency": "Initial Currency",
+        "Current Quantity": "Initial Quantity",
+        "Current Unit": "Initial Unit",
     }
+    informative_columns = [
+        "Location",
+        "Initial Currency",
+        "Final Currency",
+        "Initial Quantity",
+        "Initial Unit",
+        "Final Quantity",
+        "Final Unit",
+        "Density",
+        "Upload on PR",
+    ]
+
+    return df.join(input_df.rename(columns=renamer)[informative_columns])
+
+
+def write_excel_sheets(sheets: dict, file_path: str):
+    """
+        this function writes the given data frames into a new Excel file in one pass, one sheet per
+        data frame, replacing the file if it exists
 
-    create_mapped_column("Location", dfs=mapping_related_dfs)
-    create_mapped_column("Current Currency", dfs=mapping_related_dfs)
-    create_mapped_column("Final Currency", dfs=mapping_related_dfs)
-    create_mapped_column("Current Quantity", dfs=mapping_related_dfs)
-    create_mapped_column("Current Unit", dfs=mapping_related_dfs)
-    create_mapped_column("Final Quantity", dfs=mapping_related_dfs)
-    create_mapped_column("Final Unit", dfs=mapping_related_dfs)
-    create_mapped_column("Density", dfs=mapping_related_dfs)
-    create_mapped_column("Upload on PR", dfs=mapping_related_dfs)
+        Args:
+            sheets (dict): sheet name mapped to the data frame to be written into it
+            file_path (str): the path to the Excel file
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        ws = wb.create_sheet(sheet_name)
+        for row in dataframe_to_rows(df.astype(object).where(df.notna(), None), index=False, header=True):
+            ws.append(row)
 
-    return df
+    try:
+        wb.save(file_path)
+    except PermissionError:
+        raise Exception("File might be open. Close it.")
 
 
 def touch_excel(
@@ -196,12 +174,13 @@ def touch_excel(
     if add_df is not None:
         df = pd.concat([df, add_df], ignore_index=True)
 
+    if not os.path.exists(file_path):
+        write_excel_sheets({sheet_name: df}, file_path)
+        return
+
     try:
-        if not os.path.exists(file_path):
-            df.to_excel(file_path, sheet_name=sheet_name, index=False)
-        else:
-            with pd.ExcelWriter(file_path, mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        with pd.ExcelWriter(file_path, mode='a', engine='openpyxl', if_sheet_exists='replace') as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
     except PermissionError:
         raise Exception("File might be open. Close it.")
 
@@ -238,30 +217,32 @@ def convert_price_for_uom(df: pd.DataFrame):
             A Pandas DataFrame with the converted prices.
         """
     uom_config = get_local_config("uom_config.json")
-    unique_uom_combos = df[["Initial Unit", "Final Unit"]].drop_duplicates()
-    temp_df = df.copy()
-    for index, row in unique_uom_combos.iterrows():
-        initial_unit = row["Initial Unit"]
-        final_unit = row["Final Unit"]
-
-        uom_combo_df = df.loc[
-            (df["Initial Unit"] == initial_unit) &
-            (df["Final Unit"] == final_unit)
-            ]
-
-        to_SI_unit_rate = uom_config["mass_conversion_rates"][initial_unit.lower()]
-        temp_df["UOM Converted Price"] = uom_combo_df["Initial Price"] * to_SI_unit_rate  # converting to SI unit
-        to_final_unit_rate = uom_config["mass_conversion_rates"][final_unit.lower()]
-        temp_df["UOM Converted Price"] = temp_df["UOM Converted Price"] / to_final_unit_rate  # converting to final unit
-        df.loc[
-            (df["Initial Unit"] == initial_unit) &
-            (df["Final Unit"] == final_unit),
-            "UOM Converted Price"] = temp_df.loc[
-            temp_df["UOM Converted Price"] != NameError]  # feeding it into data frame
+    rates = uom_config["mass_conversion_rates"]
+    to_SI_unit_rates = df["Initial Unit"].str.lower().map(rates).to_numpy()
+    to_final_unit_rates = df["Final Unit"].str.lower().map(rates).to_numpy()
+    df["UOM Converted Price"] = df["Initial Price"].to_numpy() * to_SI_unit_rates / to_final_unit_rates
 
     return df
 
 
+@lru_cache(maxsize=None)
+def get_conversion_rate(from_: str, to_: str, year_: int, month_: int):
+    """
+        this function fetches the monthly conversion rate between two currencies, memoized so that
+        repeated combinations are only looked up once per run
+
+        Args:
+            from_ (str): the currency to convert from
+            to_ (str): the currency to convert to
+            year_ (int): the year of the rate
+            month_ (int): the month of the rate
+
+        Returns:
+            float: the conversion rate
+    """
+    return xcc.get_conversion_rate(from_=from_, to_=to_, year_=year_, month_=month_)
+
+
 def convert_price_for_currency(df: pd.DataFrame):
     """
         this function converts the initially given currency into the desired currency
@@ -272,25 +253,16 @@ def convert_price_for_currency(df: pd.DataFrame):
         Returns:
             pandas.DataFrame: data frame with converted currencies
     """
-    unique_currency_combos = df[["Initial Currency", "Final Currency", "Date"]].drop_duplicates()
+    combo_columns = ["Initial Currency", "Final Currency", "Date"]
+    unique_currency_combos = df[combo_columns].drop_duplicates()
 
-    for index, row in unique_currency_combos.iterrows():
-        initial_currency = row["Initial Currency"]
-        final_currency = row["Final Currency"]
-        date = row["Date"]
-        year = date.year
-        month = date.month
+    unique_currency_combos["Conversion Rate"] = [
+        get_conversion_rate(from_=initial_currency, to_=final_currency, year_=date.year, month_=date.month)
+        for initial_currency, final_currency, date in unique_currency_combos.itertuples(index=False, name=None)
+    ]
 
-        currency_conversion_rate = xcc.get_conversion_rate(from_=initial_currency, to_=final_currency, year_=year,
-                                                           month_=month)
-
-        df.loc[
-            (df["Initial Currency"] == initial_currency) &
-            (df["Final Currency"] == final_currency) &
-            (df["Date"] == date),
-            "Conversion Rate"] = currency_conversion_rate
-
-        df["Price"] = df["Conversion Rate"] * df["UOM Converted Price"]
+    df = df.merge(unique_currency_combos, on=combo_columns, how="left").set_axis(df.index)
+    df["Price"] = df["Conversion Rate"] * df["UOM Converted Price"]
 
     df = df.rename(columns={"Conversion Rate": "Currency Conversion Rate"})
     return df
@@ -306,101 +278,356 @@ def extract_date(month,year):
         Returns:
             A date object representing the extracted date.
         """
+    return date(int(year), MONTH_MAP[month], 1)
+
+
 
-    month_mapping = {
-        "Jan": 1,
-        "Feb": 2,
-        "Mar": 3,
-        "Apr": 4,
-        "May": 5,
-        "Jun": 6,
-        "Jul": 7,
-        "Aug": 8,
-        "Sep": 9,
-        "Oct": 10,
-        "Nov": 11,
-        "Dec": 12,
-    }
-    month = month_mapping[month]
-    year = int(year)
-    first_date = date(year, month, 1)
-    return first_date
 
+def normalize_history_df(hist_df: pd.DataFrame):
+    """
+        this function coerces the Year, Month and rate columns of a product history to numbers,
+        turning text cells such as 'n/a' into NaN, so the history can be sorted and stored in Parquet
+
+        Args:
+            hist_df (pandas.DataFrame): the history to be normalized
 
+        Returns:
+            pandas.DataFrame: the history with numeric Year, Month and rate columns
+    """
+    numeric_columns = [col for col in hist_df.columns
+                       if col in ('Year', 'Month') or str(col).endswith(' to USD') or str(col).startswith('USD to ')]
+    hist_df = hist_df.assign(**{col: pd.to_numeric(hist_df[col], errors='coerce') for col in numeric_columns})
+    return normalize_mixed_columns(hist_df)
+
+
+def migrate_history_workbook(data_path):
+    """
+        this function moves the product sheets of All-Xrates-Data.xlsx that have no Parquet history
+        yet into Parquet, reading the workbook once for all of them
+
+        Args:
+            data_path (Path): path to the folder where the history is stored
+    """
+    history_dir = os.path.join(data_path, "xrates")
+    workbook_path = os.path.join(data_path, "All-Xrates-Data.xlsx")
+    if not os.path.exists(workbook_path):
+        return
+
+    wb = openpyxl.load_workbook(workbook_path, read_only=True)
+    legacy_products = [product for product in wb.sheetnames
+                       if not os.path.exists(os.path.join(history_dir, f"{product}.parquet"))]
+    wb.close()
+    if not legacy_products:
+        return
+
+    for product, hist_df in pd.read_excel(workbook_path, sheet_name=legacy_products).items():
+        normalize_history_df(hist_df).to_parquet(os.path.join(history_dir, f"{product}.parquet"), index=False)
+
+
+def get_history_df(data_path, product):
+    """
+        this function reads the stored history of a product
+
+        Args:
+            data_path (Path): path to the folder where the history is stored
+            product (str): the product whose history is read
+
+        Returns:
+            pandas.DataFrame: the stored history of the product, or None if the product has none
+    """
+    history_path = os.path.join(data_path, "xrates", f"{product}.parquet")
+    if not os.path.exists(history_path):
+        return None
+    return pd.read_parquet(history_path)
 
 
 def writing_all_file(df,product):
     """
-    This function reads the Data Frame and write it in the output file . If the output file is
-    already present it will concat the historical data and the new dataframe and writes it in the
-    output file . If the output file is not present it will make one and writes the new df to it.
+    This function reads the Data Frame and write it in the product's history file . If the history
+    is already present it will concat the historical data and the new dataframe and writes it in the
+    history file . If the history is not present it will make one and writes the new df to it.
     Args:
-        df: The main Data Frame to write in the output file
+        df: The main Data Frame to write in the history file
+        product: The product whose history is written
 
     Returns:
-
+        pandas.DataFrame: the written history of the product
     """
-    flag=0
     global_config: dict = get_global_config()
     data_path = get_data_path(global_config)
-    sorted_df = df.copy()
     current_year = datetime.now().year
     current_month = datetime.now().month
     current_year=int(current_year)
     current_month=int(current_month)
-    try:
-        path_to_hist_file = os.path.join(data_path, "All-Xrates-Data.xlsx")
-        existing_df = pd.read_excel(path_to_hist_file,sheet_name=f'{product}')
-        index_to_delete=-1
-
-        for index,row in existing_df.iterrows():
-            try:
-                if int(row['Month']) == current_month and int(row['Year'])==current_year:
-                    index_to_delete=index
-                    break
-
-            except Exception as e:
-                print(e)
-                pass
-        # index_to_delete = existing_df[(existing_df['Month'] == current_month) & (existing_df['Year'] == current_year)].index
-
-        if index_to_delete!=-1:
-            print('Updated')
-            existing_df.drop(index=index_to_delete, inplace=True)
-
-        print(f'Wrting for {product}')
-        hist_df = pd.concat([existing_df, sorted_df], ignore_index=True)
-
-        hist_df = hist_df.drop_duplicates(subset=['Year','Month'])
-        hist_df = hist_df.sort_values(by=['Year','Month'], ascending=False)
-        touch_excel(hist_df, os.path.join(data_path, "All-Xrates-Data.xlsx"),sheet_name=f'{product}')
-        backup_path = os.path.join(data_path, 'Backups')
-        month = max(df['Month'])
-        year = max(df['Year'])
-        touch_excel(existing_df, os.path.join(backup_path, f'{month} {year} All-Xrates-Data.xlsx'),
-                    sheet_name=f'{product}')
-    except:
-
-        existing_df = sorted_df.sort_values(by=['Year','Month'], ascending=False)
-        touch_excel(existing_df, os.path.join(data_path, "All-Xrates-Data.xlsx"),sheet_name=f'{product}')
-        backup_path = os.path.join(data_path, 'Backups')
-        month=max(df['Month'])
-        year=max(df['Year'])
-        touch_excel(existing_df, os.path.join(backup_path, f'{month} {year} All-Xrates-Data.xlsx'),sheet_name=f'{product}')
+    path_to_hist_file = os.path.join(data_path, "xrates", f"{product}.parquet")
+
+    existing_df = get_history_df(data_path, product)
+    if existing_df is None:
+        hist_df = normalize_history_df(df).sort_values(by=['Year','Month'], ascending=False)
+        hist_df.to_parquet(path_to_hist_file, index=False)
+        return hist_df
+
+    months = pd.to_numeric(existing_df['Month'], errors='coerce').to_numpy()
+    years = pd.to_numeric(existing_df['Year'], errors='coerce').to_numpy()
+    current_rows = np.flatnonzero((months == current_month) & (years == current_year))
+
+    if current_rows.size:
+        print('Updated')
+        existing_df = existing_df.drop(existing_df.index[current_rows])
+
+    print(f'Wrting for {product}')
+    hist_df = pd.concat([existing_df, df], ignore_index=True)
+
+    hist_df = hist_df.drop_duplicates(subset=['Year','Month'])
+    hist_df = normalize_history_df(hist_df).sort_values(by=['Year','Month'], ascending=False)
+    hist_df.to_parquet(path_to_hist_file, index=False)
+
+    return hist_df
 
 def update_input_file(input_df, months ,years):
     global_config: dict = get_global_config()
     data_path = get_data_path(global_config)
-    for index, row in input_df.iterrows():
-        product = row['Initial Currency']
+    input_df['Fetched Year'] = input_df['Initial Currency'].map(years).fillna(input_df['Fetched Year']) \
+        .astype(input_df['Fetched Year'].dtype)
+
+    touch_excel(input_df, os.path.join(data_path, "Inputs.xlsx"), sheet_name="All Currencies")
+    normalize_mixed_columns(input_df).to_parquet(os.path.join(data_path, "inputs.parquet"), index=False)
+
+
+def write_history_workbook(data_path, histories: dict):
+    """
+        this function rewrites All-Xrates-Data.xlsx in a single pass with one sheet per stored product
+        history
+
+        Args:
+            data_path (Path): path to the folder where the workbook is stored
+            histories (dict): product name mapped to its history data frame written in this run
+    """
+    history_dir = os.path.join(data_path, "xrates")
+    workbook_path = os.path.join(data_path, "All-Xrates-Data.xlsx")
+    products = sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(history_dir)
+                      if file_name.endswith(".parquet"))
+
+    sheets = {}
+    for product in products:
+        if product in histories:
+            sheets[product] = histories[product]
+        else:
+            sheets[product] = pd.read_parquet(os.path.join(history_dir, f"{product}.parquet"))
+
+    write_excel_sheets(sheets, workbook_path)
+
+
+def parse_year(html: str):
+    """
+        this function extracts the monthly average lines from an x-rates average page
 
+        Args:
+            html (str): html of the x-rates average page
+
+        Returns:
+            list: (month abbreviation, average rate) pairs of the monthly averages list
+    """
+    tree = LH.fromstring(html)
+    ul = tree.xpath("//ul[@class='OutputLinksAvg']")
+    if not ul:
+        raise ValueError("Monthly averages not found on the page")
+
+    rows = []
+    for li in ul[0].xpath("./li"):
+        month = li.xpath("string(.//span[1])").strip()
+        if not month:
+            continue
+        rows.append((month, float(li.xpath("string(.//span[2])"))))
+    return rows
+
+
+def get_cache_path(cache_dir: str, curr: str, year: int):
+    """
+        this function returns the path of the cached x-rates page of a currency for the given year
+
+        Args:
+            cache_dir (str): the folder where the pages are cached
+            curr (str): the currency converted to USD
+            year (int): the year of the averages
+
+        Returns:
+            str: path of the cached page
+    """
+    return os.path.join(cache_dir, f"{curr} {year}.html")
+
+
+def read_cached_page(cache_path: str, year: int):
+    """
+        this function reads a cached x-rates page if it is still valid. Pages fetched after their
+        year ended never change, pages of a running year expire after CURRENT_YEAR_CACHE_EXPIRY
+
+        Args:
+            cache_path (str): path of the cached page
+            year (int): the year of the averages on the page
+
+        Returns:
+            str: html of the cached page, or None if it is missing or expired
+    """
+    if not os.path.exists(cache_path):
+        return None
+
+    fetched_at = datetime.fromtimestamp(os.path.getmtime(cache_path))
+    if fetched_at.year <= year and datetime.now() - fetched_at > CURRENT_YEAR_CACHE_EXPIRY:
+        return None
+
+    with open(cache_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def fetch_year(
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        curr: str,
+        year: int):
+    """
+        this function fetches the x-rates average page of a currency for the given year
+
+        Args:
+            client (httpx.AsyncClient): the pooled client used for the request
+            semaphore (asyncio.Semaphore): caps the number of requests in flight
+            curr (str): the currency to be converted to USD
+            year (int): the year for which the averages are fetched
+
+        Returns:
+            str: html of the fetched page
+    """
+    params = {"from": curr, "to": "USD", "amount": 1, "year": year}
+    async with semaphore:
+        response = await client.get("/average/", params=params)
+    response.raise_for_status()
+    return response.text
+
+
+async def scrape_year(
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+        curr: str,
+        year: int,
+        cache_dir: str,
+        retries: int = 5):
+    """
+        this function fetches and parses the monthly averages of a currency for the given year,
+        serving the page from the on-disk cache when possible. Fetching and parsing are retried
+        together with exponential backoff, so a page served without the averages is fetched again
+
+        Args:
+            client (httpx.AsyncClient): the pooled client used for the request
+            semaphore (asyncio.Semaphore): caps the number of requests in flight
+            executor (ThreadPoolExecutor): the worker threads the page is parsed on
+            curr (str): the currency to be converted to USD
+            year (int): the year for which the averages are fetched
+            cache_dir (str): the folder where the pages are cached
+            retries (int): number of attempts before giving up
+
+        Returns:
+            list: (month abbreviation, average rate) pairs of the monthly averages list
+    """
+    loop = asyncio.get_running_loop()
+    cache_path = get_cache_path(cache_dir, curr, year)
+    html = read_cached_page(cache_path, year)
+    if html is not None:
+        return await loop.run_in_executor(executor, parse_year, html)
+
+    delay = 1
+    for attempt in range(retries):
         try:
-            fetch_date = years[product]
-            input_df.at[index, 'Fetched Year'] = fetch_date
-        except:
-            pass
+            html = await fetch_year(client, semaphore, curr, year)
+            rows = await loop.run_in_executor(executor, parse_year, html)
+            break
+        except Exception as e:
+            print(e)
+            if attempt == retries - 1:
+                raise
+            await asyncio.sleep(delay)
+            delay *= 2
+
+    with open(cache_path, "w", encoding="utf-8") as f:
+        f.write(html)
+    return rows
+
+
+def build_currency_df(curr: str, pages: dict):
+    """
+        this function builds the monthly rates data frame of a currency from its parsed pages
 
-    touch_excel(input_df, os.path.join(data_path, "Inputs.xlsx"), sheet_name="All Currencies")
+        Args:
+            curr (str): the currency converted to USD
+            pages (dict): year mapped to the parsed (month, rate) pairs of its page, or the exception raised while scraping it
+
+        Returns:
+            pandas.DataFrame: monthly rates of the currency to and from USD
+    """
+    data = []
+    for year, rows in pages.items():
+        if isinstance(rows, Exception):
+            print(rows)
+            print(f'skipping for {curr}')
+            continue
+        print(rows)
+        for month, crate in rows:
+            fmonth=extract_date(month,year).month
+            fcrate=1/crate if crate else 0.0
+            data.append((curr, "USD", year, fmonth, crate, fcrate))
+    print(data)
+    df = pd.DataFrame(data, columns=['Currency 1', 'Currency 2', 'Year', 'Month', 'rate', 'inv_rate'])
+    return df.rename(columns={'rate': f'{curr} to USD', 'inv_rate': f'USD to {curr}'})
+
+
+async def scrape_currency(
+        client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        executor: ThreadPoolExecutor,
+        curr: str,
+        start_year: int,
+        cache_dir: str):
+    """
+        this function scrapes every year of a currency from the given year up to the current one
+
+        Args:
+            client (httpx.AsyncClient): the pooled client used for the requests
+            semaphore (asyncio.Semaphore): caps the number of requests in flight
+            executor (ThreadPoolExecutor): the worker threads the pages are processed on
+            curr (str): the currency to be converted to USD
+            start_year (int): the first year to be scraped
+            cache_dir (str): the folder where the pages are cached
+
+        Returns:
+            tuple: the currency and its monthly rates data frame
+    """
+    years = range(start_year, datetime.now().year + 1)
+    tasks = [scrape_year(client, semaphore, executor, curr, year, cache_dir) for year in years]
+    pages = await asyncio.gather(*tasks, return_exceptions=True)
+    loop = asyncio.get_running_loop()
+    df = await loop.run_in_executor(executor, build_currency_df, curr, dict(zip(years, pages)))
+    return curr, df
+
+
+async def scrape_all(start_years: dict, cache_dir: str):
+    """
+        this function scrapes all the given currencies concurrently
+
+        Args:
+            start_years (dict): currency mapped to the first year to be scraped
+            cache_dir (str): the folder where the pages are cached
+
+        Returns:
+            list: (currency, monthly rates data frame) pairs, in the order of the given currencies
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS)
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        async with httpx.AsyncClient(base_url=XRATES_BASE_URL, http2=True, headers=HEADERS,
+                                     timeout=10.0, limits=limits, follow_redirects=True) as client:
+            tasks = [scrape_currency(client, semaphore, executor, curr, start_year, cache_dir)
+                     for curr, start_year in start_years.items()]
+            return await asyncio.gather(*tasks)
 
 
 def main():
@@ -408,15 +635,18 @@ def main():
     data_path = get_data_path(global_config)
     input_df = get_input_df(data_path, global_config)
     os.makedirs(os.path.join(data_path, "Backups"), exist_ok=True)
+    os.makedirs(os.path.join(data_path, "xrates"), exist_ok=True)
+    migrate_history_workbook(data_path)
+    cache_dir = os.path.join(data_path, "Cache")
+    os.makedirs(cache_dir, exist_ok=True)
     max_year=datetime.now().year
     print(input_df)
     max_years={}
     max_month={}
+    start_years={}
+    histories={}
 
-    for index , row in input_df.iterrows():
-        data = []
-        curr=row['Initial Currency']
-        year=row['Fetched Year']
+    for curr, year in input_df[['Initial Currency', 'Fetched Year']].itertuples(index=False, name=None):
         year=int(year)
 
         print(curr)
@@ -424,76 +654,25 @@ def main():
         if 'USD'==curr:
             print('Skipping')
             continue
-        current_year = datetime.now().year
-        while year<=current_year:
-            retry=5
-            flag=1
-            while retry:
-                try:
-                    url = f"https://www.x-rates.com/average/?from={curr}&to=USD&amount=1&year={year}"
-                    headers = {
-                        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/96.0.4664.93 Safari/537.36'}
-                    html = requests.get(url, headers=headers).text
-                    soup = BeautifulSoup(html, "lxml")
-                    select = soup.find('select', {"id": "to"})
-                    options = select.find_all('option')
-                    ul = soup.find("ul", class_='OutputLinksAvg')
-                    lists = ul.text.split("\n")
-                    flag=0
-                    break
-                except Exception as e:
-                    print(e)
-                    retry-=1
-                    time.sleep(1)
-                    if retry==0:
-                        print(f'skipping for {curr}')
-
-            if flag:
-                year += 1
-                continue
-            print(lists)
-            for lis in lists:
-
-                lis_text = lis.split(" ")
-                if len(lis_text)<=1:
-                    continue
-                print(lis_text)
-                month=lis_text[0]
-                crate=lis_text[1]
-                crate=float(crate)
-                date=extract_date(month,year)
-                fmonth=date.month
-                fyear=date.year
-                fmonth=int(fmonth)
-
-                try:
-                    fcrate=1/crate
-                except:
-                    fcrate=0
-                data.append({
-                    'Currency 1':curr,
-                    "Currency 2":"USD",
-                    'Year': year,
-                    'Month': fmonth,
-                    f'{curr} to USD':crate,
-                    f'USD to {curr}':fcrate
-
-                })
-            year+=1
-        print(data)
-        df = pd.DataFrame(data)
+        start_years[curr]=year
 
+    for curr, df in asyncio.run(scrape_all(start_years, cache_dir)):
         if df.empty:
             continue
         max_month[curr] = max(df['Month'])
         max_years[curr] = max(df['Year'])
         sname=f'{curr}'
-        writing_all_file(df,sname)
+        histories[sname] = writing_all_file(df,sname)
     if len(max_years)==0 or len(max_month)==0:
         return
+    workbook_path = os.path.join(data_path, "All-Xrates-Data.xlsx")
+    if os.path.exists(workbook_path):
+        shutil.copy2(workbook_path,
+                     os.path.join(data_path, 'Backups',
+                                  f'{max(max_month.values())} {max(max_years.values())} All-Xrates-Data.xlsx'))
+    write_history_workbook(data_path, histories)
     update_input_file(input_df,max_month,max_years)
 
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file